@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
 import requests
-import networkx as nx
-import matplotlib.pyplot as plt
+import plotly.graph_objects as go
 import numpy as np
-from scipy.stats import fisher_exact
-import io
+from scipy.stats import hypergeom
+
+from kegg_data import assign_roles, build_search_blob, get_kegg_genes, search_gene_rows, seeded_lit_score
+from network_layout import clique_edges, compute_layout
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="NeuroMetabolic Framework", page_icon="🧬", layout="wide")
@@ -21,61 +22,128 @@ role_colors = {
     "🧬 Pathway Component": "#D5D8DC"
 }
 
-# --- DATA ACQUISITION (KEGG API) ---
+# --- BIOLOGICAL LOGIC FUNCTION ---
+# Expanded Core Dictionary for all 13 Diseases
+CORE_GENES_BY_DISEASE = {
+    "Huntington's": frozenset({"HTT", "BDNF", "CASP3", "CREB1", "TP53", "SOD1", "PPARGC1A"}),
+    "Alzheimer's": frozenset({"APP", "MAPT", "APOE", "PSEN1", "PSEN2", "BACE1"}),
+    "Parkinson's": frozenset({"SNCA", "PRKN", "PINK1", "LRRK2", "PARK7"}),
+    "ALS": frozenset({"SOD1", "TARDBP", "FUS", "C9orf72", "OPTN"}),
+    "Prion Disease": frozenset({"PRNP", "TNP1", "STIP1"}),
+    "Spinocerebellar Ataxia": frozenset({"ATXN1", "ATXN2", "ATXN3", "CACNA1A"}),
+    "Spinal Muscular Atrophy": frozenset({"SMN1", "SMN2", "VAPB"}),
+    "Autism Spectrum Disorder": frozenset({"SHANK3", "NLGN3", "NRXN1", "PTEN"}),
+    "Schizophrenia": frozenset({"DRD2", "DISC1", "COMT", "GRIN2A"}),
+    "Bipolar Disorder": frozenset({"ANK3", "CACNA1C", "CLOCK"}),
+    "Depression": frozenset({"SLC6A4", "BDNF", "HTR1A", "MAOA"}),
+    "Type II Diabetes": frozenset({"INS", "INSR", "IRS1", "SLC2A4"}),
+    "Insulin Resistance": frozenset({"IRS1", "PIK3CA", "AKT1"})
+}
+
+# --- PRIORITY CHART ---
 @st.cache_data
-def get_kegg_genes(pathway_id):
-    url = f"https://rest.kegg.jp/get/{pathway_id}"
-    response = requests.get(url)
-    genes = []
-    if response.status_code == 200:
-        lines = response.text.split('\n')
-        is_gene_section = False
-        for line in lines:
-            if line.startswith('GENE'):
-                is_gene_section = True
-                line = line.replace('GENE', '').strip()
-            elif line.startswith('COMPOUND') or line.startswith('REFERENCE') or line.startswith('AUTHORS'):
-                is_gene_section = False
-            
-            if is_gene_section and line:
-                if ';' in line:
-                    parts = line.split('; ')
-                    description = parts[1].strip()
-                    id_symbol_part = parts[0].strip()
-                    sub_parts = id_symbol_part.split(None, 1) 
-                    if len(sub_parts) >= 2:
-                        gene_id = sub_parts[0].strip()
-                        gene_symbol = sub_parts[1].strip()
-                        genes.append({'ID': gene_id, 'Symbol': gene_symbol, 'Description': description})
-    return pd.DataFrame(genes)
+def build_priority_figure(symbols, scores):
+    # Drawn in the browser, and cached so reruns resend the same top-10 figure
+    fig_bar = go.Figure(go.Bar(x=scores, y=symbols, orientation='h', marker_color='#FF4B4B'))
+    fig_bar.update_layout(height=400, margin=dict(l=0, r=0, t=20, b=0), yaxis=dict(autorange='reversed'))
+    return fig_bar
 
-# --- BIOLOGICAL LOGIC FUNCTION ---
-def assign_role(symbol, desc, disease_name):
-    # Expanded Core Dictionary for all 13 Diseases
-    core_dict = {
-        "Huntington's": ["HTT", "BDNF", "CASP3", "CREB1", "TP53", "SOD1", "PPARGC1A"],
-        "Alzheimer's": ["APP", "MAPT", "APOE", "PSEN1", "PSEN2", "BACE1"],
-        "Parkinson's": ["SNCA", "PRKN", "PINK1", "LRRK2", "PARK7"],
-        "ALS": ["SOD1", "TARDBP", "FUS", "C9orf72", "OPTN"],
-        "Prion Disease": ["PRNP", "TNP1", "STIP1"],
-        "Spinocerebellar Ataxia": ["ATXN1", "ATXN2", "ATXN3", "CACNA1A"],
-        "Spinal Muscular Atrophy": ["SMN1", "SMN2", "VAPB"],
-        "Autism Spectrum Disorder": ["SHANK3", "NLGN3", "NRXN1", "PTEN"],
-        "Schizophrenia": ["DRD2", "DISC1", "COMT", "GRIN2A"],
-        "Bipolar Disorder": ["ANK3", "CACNA1C", "CLOCK"],
-        "Depression": ["SLC6A4", "BDNF", "HTR1A", "MAOA"],
-        "Type II Diabetes": ["INS", "INSR", "IRS1", "SLC2A4"],
-        "Insulin Resistance": ["IRS1", "PIK3CA", "AKT1"]
-    }
-    CORE_GENES = core_dict.get(disease_name, [])
-    desc_lower = desc.lower()
-    if symbol in CORE_GENES: return "⭐ Core Gene"
-    elif "mitochond" in desc_lower or "atp" in desc_lower: return "🔋 Mitochondrial Dysfunction"
-    elif "apopt" in desc_lower or "caspase" in desc_lower: return "💀 Apoptosis"
-    elif "autophagy" in desc_lower: return "♻️ Autophagy"
-    elif "synap" in desc_lower or "glutamate" in desc_lower: return "🧠 Synaptic / Excitotoxicity"
-    elif "psm" in symbol or "proteasome" in desc_lower: return "📦 Proteostasis / PSMC"
-    else: return "🧬 Pathway Component"
+# --- NETWORK RENDERING ---
+@st.cache_data
+def build_network_figure(nodes, edges, roles):
+    # WebGL traces are drawn in the browser, so reruns only resend the cached figure
+    xy = compute_layout(len(nodes), edges)
+
+    # Every edge becomes (start, end, gap) so one trace draws all segments
+    segments = np.full((len(edges), 3, 2), np.nan)
+    segments[:, 0] = xy[edges[:, 0]]
+    segments[:, 1] = xy[edges[:, 1]]
+    fig_net = go.Figure(go.Scattergl(
+        x=segments[:, :, 0].ravel(), y=segments[:, :, 1].ravel(), mode='lines',
+        line=dict(color='rgba(128, 128, 128, 0.25)', width=1), hoverinfo='skip', showlegend=False
+    ))
+
+    labels = np.array(nodes, dtype=object)
+    roles = np.array(roles, dtype=object)
+    for role, color in role_colors.items():
+        mask = roles == role
+        if mask.any():
+            fig_net.add_trace(go.Scattergl(
+                x=xy[mask, 0], y=xy[mask, 1], mode='markers+text', name=role,
+                text=labels[mask], textposition='top center', textfont=dict(size=8),
+                marker=dict(color=color, size=12, opacity=0.8), hovertemplate='%{text}<extra></extra>'
+            ))
+
+    fig_net.update_layout(
+        height=650, margin=dict(l=0, r=0, t=20, b=0), legend_title_text="Mechanisms",
+        xaxis=dict(visible=False), yaxis=dict(visible=False),
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig_net
+
+# --- GENE EXPLORER ---
+@st.fragment
+def render_gene_explorer(df, search_blob, ranked):
+    # A fragment: a new query or gene pick reruns only the table, not the whole script
+    col_a, col_b = st.columns([2, 1])
+    with col_a:
+        st.subheader("Genetic Components")
+        search_query = st.text_input("🔍 Search genes or mechanisms:", placeholder="Type to filter...")
+    with col_b:
+        st.subheader("Deep Dive")
+        selected_gene = st.selectbox("External Research:", ["Select a Gene"] + list(df['Symbol'].unique()))
+        if selected_gene != "Select a Gene":
+            st.markdown(f"**[View {selected_gene} on GeneCards ↗️](https://www.genecards.org/cgi-bin/carddisp.pl?gene={selected_gene})**")
+
+    filtered_df = ranked
+    if search_query:
+        # Literal, case-insensitive substring match over the per-row search blob; only the matches are sorted
+        filtered_df = df.iloc[search_gene_rows(search_blob, search_query)].sort_values('Score', ascending=False)
+    st.dataframe(filtered_df[['Symbol', 'Functional Role', 'Lit_Score', 'Score', 'Description']], use_container_width=True, height=300)
+
+# --- INTERACTOME TAB ---
+@st.fragment
+def render_interactome(df, ranked):
+    # A fragment: changing the network controls reruns only this block, not the whole script
+    c1, c2 = st.columns(2)
+    with c1:
+        roles = list(df['Functional Role'].unique())
+        selected_roles = st.multiselect("Filter by Mechanism:", roles, default=roles)
+    with c2:
+        remove_core = st.checkbox("🔬 Remove Core Genes (View Secondary Controllers)", value=False)
+    
+    # Only the columns the graph needs; tied scores keep the same order as before
+    # With every mechanism selected the pre-sorted frame is already the answer; a subset is sorted on its own
+    if len(selected_roles) == len(roles):
+        plot_df = ranked[['Symbol', 'Functional Role', 'Score']].head(50)
+    else:
+        plot_df = df.loc[df['Functional Role'].isin(selected_roles), ['Symbol', 'Functional Role', 'Score']]
+        plot_df = plot_df.sort_values('Score', ascending=False).head(50)
+    if remove_core:
+        plot_df = plot_df[~plot_df['Functional Role'].str.contains("Core")]
+    plot_df = plot_df.drop_duplicates('Symbol')
+
+    # Nodes are row positions in plot_df; edges are int32 index pairs
+    nodes = tuple(plot_df['Symbol'])
+    node_roles = tuple(plot_df['Functional Role'])
+    edges = clique_edges(
+        members for role, members in plot_df.groupby('Functional Role', observed=True).indices.items()
+        if role != "🧬 Pathway Component"
+    )
+    degrees = np.bincount(edges.ravel(), minlength=len(nodes))
+
+    col_stats, col_graph = st.columns([1, 3])
+    with col_stats:
+        st.markdown("### **Metrics**")
+        st.metric("Total Nodes", len(nodes))
+        st.write("---")
+        st.write("**Top Hubs**")
+        for i in np.argsort(-degrees, kind='stable')[:3]:
+            st.write(f"• {nodes[i]}: {degrees[i]}")
+
+    with col_graph:
+        st.plotly_chart(build_network_figure(nodes, edges, node_roles), use_container_width=True)
+    return len(nodes)
 
 # --- SIDEBAR: STYLISH RESEARCHER PROFILE ---
 st.sidebar.markdown("""
@@ -129,16 +197,25 @@ st.sidebar.markdown("""
 """, unsafe_allow_html=True)
 
 # CV Download Button
-try:
-    with open("CV_Yashwant_Nama_PhD_Application.pdf", "rb") as file:
-        st.sidebar.download_button(
-            label="📄 Access Full Curriculum Vitae",
-            data=file,
-            file_name="Yashwant_Nama_CV.pdf",
-            mime="application/pdf",
-            use_container_width=True
-        )
-except:
+@st.cache_resource
+def load_cv_bytes():
+    # Read the PDF once per process instead of on every rerun
+    try:
+        with open("CV_Yashwant_Nama_PhD_Application.pdf", "rb") as file:
+            return file.read()
+    except OSError:
+        return None
+
+cv_bytes = load_cv_bytes()
+if cv_bytes:
+    st.sidebar.download_button(
+        label="📄 Access Full Curriculum Vitae",
+        data=cv_bytes,
+        file_name="Yashwant_Nama_CV.pdf",
+        mime="application/pdf",
+        use_container_width=True
+    )
+else:
     st.sidebar.info("📂 [CV currently being updated]")
 
 # Disease Selection (Updated to 13 Diseases)
@@ -178,23 +255,34 @@ st.sidebar.markdown("""
 """, unsafe_allow_html=True)
 
 # --- LOAD DATA ---
-df = get_kegg_genes(pathway_id)
-if not df.empty:
-    df["Functional Role"] = df.apply(lambda row: assign_role(row["Symbol"], row["Description"], disease_choice), axis=1)
-    
-    def calculate_validation(symbol):
-        high_lit = ["HTT", "BDNF", "APP", "MAPT", "SNCA", "PRKN", "SOD1", "INS", "BDNF", "CASP3", "TP53"]
-        if symbol in high_lit: return 95
-        np.random.seed(sum(ord(c) for c in symbol))
-        return np.random.randint(20, 60)
-
-    def calculate_priority(row):
-        base = 100 if "Core" in row['Functional Role'] else 50
-        lit = calculate_validation(row['Symbol'])
-        return (base * 0.6) + (lit * 0.4)
-
-    df['Lit_Score'] = df['Symbol'].apply(calculate_validation)
-    df['Score'] = df.apply(calculate_priority, axis=1)
+HIGH_LIT_GENES = frozenset({"HTT", "BDNF", "APP", "MAPT", "SNCA", "PRKN", "SOD1", "INS", "CASP3", "TP53"})
+
+def load_pathway_frame(pathway_id, disease_name):
+    df = get_kegg_genes(pathway_id).copy()
+    if not df.empty:
+        df["Functional Role"] = assign_roles(df["Symbol"], df["Description"], CORE_GENES_BY_DISEASE.get(disease_name, frozenset()))
+
+        # Each symbol seeds its draw with its character sum; everything after that is whole-column arithmetic
+        seeds = [sum(map(ord, symbol)) for symbol in df['Symbol']]
+        df['Lit_Score'] = np.where(df['Symbol'].isin(HIGH_LIT_GENES), 95, [seeded_lit_score(seed) for seed in seeds])
+        base = np.where(df['Functional Role'].str.contains("Core", regex=False), 100, 50)
+        df['Score'] = (base * 0.6) + (df['Lit_Score'] * 0.4)
+        # Only seven distinct roles: integer codes make the isin/groupby/value_counts calls cheaper.
+        # Categories follow role_colors, so codes mean the same role in every frame.
+        df['Functional Role'] = pd.Categorical(df['Functional Role'], categories=list(role_colors))
+    return df
+
+# Keep each enriched frame, its search blob and its score ranking in session state so reruns skip the cache lookup and re-scoring
+pathway_frames = st.session_state.setdefault("pathway_frames", {})
+if pathway_id not in pathway_frames:
+    try:
+        frame = load_pathway_frame(pathway_id, disease_choice)
+        ranked = frame.sort_values('Score', ascending=False)
+        pathway_frames[pathway_id] = (frame, build_search_blob(frame, ['Symbol', 'Functional Role']), ranked)
+    except requests.RequestException as exc:
+        st.error(f"Could not load {pathway_id} from KEGG: {exc}")
+        st.stop()
+df, search_blob, ranked = pathway_frames[pathway_id]
 
 # --- MAIN CONTENT ---
 st.title(f"🧬 {disease_choice} Metabolic Framework")
@@ -204,19 +292,7 @@ st.markdown(f"*This resource guide serves as a foundational reference for comput
 tab1, tab2, tab3 = st.tabs(["📊 Target Discovery", "🕸️ Interaction Network", "🔬 Enrichment & Manuscript"])
 
 with tab1:
-    col_a, col_b = st.columns([2, 1])
-    with col_a:
-        st.subheader("Genetic Components")
-        search_query = st.text_input("🔍 Search genes or mechanisms:", placeholder="Type to filter...")
-    with col_b:
-        st.subheader("Deep Dive")
-        selected_gene = st.selectbox("External Research:", ["Select a Gene"] + list(df['Symbol'].unique()))
-        if selected_gene != "Select a Gene":
-            st.markdown(f"**[View {selected_gene} on GeneCards ↗️](https://www.genecards.org/cgi-bin/carddisp.pl?gene={selected_gene})**")
-
-    mask = df['Symbol'].str.contains(search_query.upper(), na=False) | df['Functional Role'].str.contains(search_query, case=False, na=False)
-    filtered_df = df[mask] if search_query else df
-    st.dataframe(filtered_df[['Symbol', 'Functional Role', 'Lit_Score', 'Score', 'Description']].sort_values('Score', ascending=False), use_container_width=True, height=300)
+    render_gene_explorer(df, search_blob, ranked)
 
     with st.expander("ℹ️ Understanding the Scoring System", expanded=False):
         col1, col2 = st.columns(2)
@@ -236,17 +312,14 @@ with tab1:
 
     st.markdown("---")
     st.subheader("🎯 Priority Candidates")
-    top_10 = df.sort_values('Score', ascending=False).head(10)
+    top_10 = ranked.head(10)
     c1, c2 = st.columns([1, 2])
     with c1:
         st.metric("Primary Target", top_10.iloc[0]['Symbol'])
-        st.download_button(label="📥 Export Analysis", data=df.to_csv(index=False).encode('utf-8-sig'), file_name=f'{disease_choice}_Analysis.csv', mime='text/csv')
+        # The CSV is built only when the button is clicked, not on every rerun
+        st.download_button(label="📥 Export Analysis", data=lambda: df.to_csv(index=False).encode('utf-8-sig'), file_name=f'{disease_choice}_Analysis.csv', mime='text/csv')
     with c2:
-        fig_bar, ax_bar = plt.subplots(figsize=(8, 4))
-        ax_bar.barh(top_10['Symbol'], top_10['Score'], color='#FF4B4B')
-        ax_bar.invert_yaxis()
-        plt.tight_layout()
-        st.pyplot(fig_bar)
+        st.plotly_chart(build_priority_figure(tuple(top_10['Symbol']), tuple(top_10['Score'])), use_container_width=True)
 
 with tab2:
     st.subheader("🕸️ Advanced Functional Interactome")
@@ -259,65 +332,28 @@ with tab2:
         * **Transcriptional regulators** serve as master bridges.
         """)
 
-    c1, c2 = st.columns(2)
-    with c1:
-        roles = list(df['Functional Role'].unique())
-        selected_roles = st.multiselect("Filter by Mechanism:", roles, default=roles)
-    with c2:
-        remove_core = st.checkbox("🔬 Remove Core Genes (View Secondary Controllers)", value=False)
-    
-    G = nx.Graph()
-    plot_df = df[df['Functional Role'].isin(selected_roles)].sort_values('Score', ascending=False).head(50)
-    if remove_core:
-        plot_df = plot_df[~plot_df['Functional Role'].str.contains("Core")]
-
-    for _, row in plot_df.iterrows():
-        G.add_node(row['Symbol'], role=row['Functional Role'])
-    
-    nodes_list = list(G.nodes(data=True))
-    for i in range(len(nodes_list)):
-        for j in range(i + 1, len(nodes_list)):
-            if nodes_list[i][1]['role'] == nodes_list[j][1]['role'] and nodes_list[i][1]['role'] != "🧬 Pathway Component":
-                G.add_edge(nodes_list[i][0], nodes_list[j][0])
-
-    col_stats, col_graph = st.columns([1, 3])
-    with col_stats:
-        st.markdown("### **Metrics**")
-        st.metric("Total Nodes", G.number_of_nodes())
-        st.write("---")
-        st.write("**Top Hubs**")
-        degrees = dict(G.degree())
-        for hub, conn in sorted(degrees.items(), key=lambda x: x[1], reverse=True)[:3]:
-            st.write(f"• {hub}: {conn}")
-
-    with col_graph:
-        fig_net, ax_net = plt.subplots(figsize=(12, 9), dpi=300)
-        pos = nx.spring_layout(G, k=0.6, seed=42)
-        for role, color in role_colors.items():
-            nodelist = [n for n, attr in G.nodes(data=True) if attr['role'] == role]
-            if nodelist:
-                nx.draw_networkx_nodes(G, pos, nodelist=nodelist, node_color=color, node_size=160, alpha=0.8, label=role, ax=ax_net)
-        nx.draw_networkx_edges(G, pos, alpha=0.15, ax=ax_net)
-        nx.draw_networkx_labels(G, pos, font_size=6, font_weight='bold', ax=ax_net)
-        ax_net.legend(loc='upper left', bbox_to_anchor=(1, 1), title="Mechanisms")
-        plt.axis('off')
-        st.pyplot(fig_net)
+    active_nodes = render_interactome(df, ranked)
 
 with tab3:
     st.subheader("📊 Mechanism-Level Enrichment Analysis")
     st.info("**Methodology:** Statistical enrichment was performed using **Fisher’s Exact Test**.")
 
     N, n_sample = len(df), 30
-    top_genes = df.sort_values('Score', ascending=False).head(n_sample)
-    enrich_results = []
-    for role in role_colors.keys():
-        k = len(top_genes[top_genes['Functional Role'] == role])
-        M = len(df[df['Functional Role'] == role])
-        if M > 0:
-            _, p = fisher_exact([[k, n_sample-k], [M-k, N-M-(n_sample-k)]], alternative='greater')
-            enrich_results.append({"Mechanism": role, "Overlap Ratio": f"{k} / {M}", "Raw P-Value": p})
-    
-    res_df = pd.DataFrame(enrich_results).sort_values("Raw P-Value")
+    top_genes = ranked.head(n_sample)
+    # Per-mechanism counts for the top genes (k) and the whole pathway (M), one pass each
+    k_by_role = top_genes['Functional Role'].value_counts()
+    M_by_role = df['Functional Role'].value_counts()
+    mechanisms = [role for role in role_colors.keys() if M_by_role.get(role, 0) > 0]
+    ks = np.array([k_by_role.get(role, 0) for role in mechanisms])
+    Ms = np.array([M_by_role.get(role, 0) for role in mechanisms])
+    # One-sided Fisher's exact test on [[k, n-k], [M-k, N-M-(n-k)]] for every mechanism at once;
+    # this is the same hypergeometric tail fisher_exact(alternative='greater') evaluates
+    p_values = hypergeom.cdf(n_sample - ks, N, n_sample, N - Ms)
+    res_df = pd.DataFrame({
+        "Mechanism": mechanisms,
+        "Overlap Ratio": [f"{k} / {M}" for k, M in zip(ks, Ms)],
+        "Raw P-Value": p_values,
+    }).sort_values("Raw P-Value")
     res_df['Adj. P-Value'] = (res_df['Raw P-Value'] * len(res_df)).clip(upper=1.0)
     res_df['-log10(p)'] = -np.log10(res_df['Adj. P-Value'].replace(0, 1e-10))
 
@@ -370,7 +406,7 @@ potential for experimental perturbation.
 
 3. NETWORK TOPOLOGY INSIGHTS
 The interactome analysis reveals a high degree of functional coupling within 
-the {top_mech} cluster. The presence of {G.number_of_nodes()} active nodes 
+the {top_mech} cluster. The presence of {active_nodes} active nodes 
 indicates a complex, multi-factorial regulatory landscape.
 
 4. PROSPECTIVE HYPOTHESIS
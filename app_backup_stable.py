@@ -1,11 +1,12 @@
 import streamlit as st
 import pandas as pd
 import requests
-import networkx as nx
-import matplotlib.pyplot as plt
+import plotly.graph_objects as go
 import numpy as np
-from scipy.stats import fisher_exact
-import io
+from scipy.stats import hypergeom
+
+from kegg_data import assign_roles, build_search_blob, get_kegg_genes, search_gene_rows
+from network_layout import clique_edges, compute_layout
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(page_title="HD Metabolic Framework", page_icon="🧬", layout="wide")
@@ -21,69 +22,199 @@ role_colors = {
     "🧬 Pathway Component": "#D5D8DC"
 }
 
-# --- DATA ACQUISITION (KEGG API) ---
+# --- BIOLOGICAL LOGIC FUNCTION ---
+CORE_HD_GENES = frozenset({"HTT", "BDNF", "CASP3", "CREB1", "TP53", "SOD1", "PPARGC1A"})
+
+# --- PRIORITY CHART ---
 @st.cache_data
-def get_kegg_genes(pathway_id):
-    url = f"https://rest.kegg.jp/get/{pathway_id}"
-    response = requests.get(url)
-    genes = []
-    if response.status_code == 200:
-        lines = response.text.split('\n')
-        is_gene_section = False
-        for line in lines:
-            if line.startswith('GENE'):
-                is_gene_section = True
-                line = line.replace('GENE', '').strip()
-            elif line.startswith('COMPOUND') or line.startswith('REFERENCE') or line.startswith('AUTHORS'):
-                is_gene_section = False
-            
-            if is_gene_section and line:
-                if ';' in line:
-                    parts = line.split('; ')
-                    description = parts[1].strip()
-                    id_symbol_part = parts[0].strip()
-                    sub_parts = id_symbol_part.split(None, 1) 
-                    if len(sub_parts) >= 2:
-                        gene_id = sub_parts[0].strip()
-                        gene_symbol = sub_parts[1].strip()
-                        genes.append({'ID': gene_id, 'Symbol': gene_symbol, 'Description': description})
-    return pd.DataFrame(genes)
+def build_priority_figure(symbols, scores):
+    # Drawn in the browser, and cached so reruns resend the same top-10 figure
+    fig_bar = go.Figure(go.Bar(x=scores, y=symbols, orientation='h', marker_color='#FF4B4B'))
+    fig_bar.update_layout(height=400, margin=dict(l=0, r=0, t=20, b=0), yaxis=dict(autorange='reversed'))
+    return fig_bar
 
-# --- BIOLOGICAL LOGIC FUNCTION ---
-def assign_role(symbol, desc):
-    CORE_HD_GENES = ["HTT", "BDNF", "CASP3", "CREB1", "TP53", "SOD1", "PPARGC1A"]
-    desc_lower = desc.lower()
-    if symbol in CORE_HD_GENES: return "⭐ Core HD Gene"
-    elif "mitochond" in desc_lower or "atp" in desc_lower: return "🔋 Mitochondrial Dysfunction"
-    elif "apopt" in desc_lower or "caspase" in desc_lower: return "💀 Apoptosis"
-    elif "autophagy" in desc_lower: return "♻️ Autophagy"
-    elif "synap" in desc_lower or "glutamate" in desc_lower: return "🧠 Synaptic / Excitotoxicity"
-    elif "psm" in symbol or "proteasome" in desc_lower: return "📦 Proteostasis / PSMC"
-    else: return "🧬 Pathway Component"
+# --- NETWORK RENDERING ---
+@st.cache_data
+def build_network_figure(nodes, edges, roles, remove_htt):
+    # WebGL traces are drawn in the browser, so reruns only resend the cached figure
+    fig_net = go.Figure()
+    if nodes:
+        xy = compute_layout(len(nodes), edges, iterations=200)
+
+        # Every edge becomes (start, end, gap) so one trace draws all segments
+        segments = np.full((len(edges), 3, 2), np.nan)
+        segments[:, 0] = xy[edges[:, 0]]
+        segments[:, 1] = xy[edges[:, 1]]
+        fig_net.add_trace(go.Scattergl(
+            x=segments[:, :, 0].ravel(), y=segments[:, :, 1].ravel(), mode='lines',
+            line=dict(color='rgba(128, 128, 128, 0.25)', width=1), hoverinfo='skip', showlegend=False
+        ))
+
+        labels = np.array(nodes, dtype=object)
+        roles = np.array(roles, dtype=object)
+        for role, color in role_colors.items():
+            mask = roles == role
+            if mask.any():
+                fig_net.add_trace(go.Scattergl(
+                    x=xy[mask, 0], y=xy[mask, 1], mode='markers+text', name=role.split(' ', 1)[1],
+                    text=labels[mask], textposition='top center', textfont=dict(size=8),
+                    marker=dict(color=color, size=12, opacity=0.8), hovertemplate='%{text}<extra></extra>'
+                ))
+
+        # --- DYNAMIC CLUSTER LABELS ---
+        if remove_htt:
+            def get_cluster_center(keywords):
+                members = [i for i, n in enumerate(nodes) if any(k in n for k in keywords)]
+                return xy[members].mean(axis=0) if members else None
+
+            apo_center = get_cluster_center(['CASP3', 'TP53', 'BDNF', 'CREB1'])
+            prot_center = get_cluster_center(['PSMA', 'PSMC', 'PSMD'])
+            meta_center = get_cluster_center(['COX', 'ATP5', 'UQCR'])
+
+            for center, offset, text in [
+                (apo_center, 0.25, "Apoptosis &<br>Transcriptional Control"),
+                # Pushed lower (-0.4) to clear the cluster nodes
+                (prot_center, -0.4, "Proteasome<br>Stress Module"),
+                (meta_center, 0.25, "Metabolic<br>Compensation"),
+            ]:
+                if center is not None:
+                    fig_net.add_annotation(x=center[0], y=center[1] + offset, text=f"<b>{text}</b>",
+                                           showarrow=False, font=dict(size=11, color='grey'), opacity=0.8)
+
+    fig_net.update_layout(
+        height=650, margin=dict(l=0, r=0, t=20, b=0), legend_title_text="Mechanisms",
+        xaxis=dict(visible=False), yaxis=dict(visible=False),
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)'
+    )
+    return fig_net
+
+# --- GENE EXPLORER ---
+@st.fragment
+def render_gene_explorer(df, search_blob):
+    # A fragment: a new query or gene pick reruns only the table, not the whole script
+    col_a, col_b = st.columns([2, 1])
+    with col_a:
+        st.subheader("Genetic Components")
+        search_query = st.text_input("🔍 Search genes or mechanisms:", placeholder="Type to filter...")
+    with col_b:
+        st.subheader("Deep Dive")
+        selected_gene = st.selectbox("External Research:", ["Select a Gene"] + list(df['Symbol'].unique()))
+        if selected_gene != "Select a Gene":
+            st.markdown(f"**[View {selected_gene} on GeneCards ↗️](https://www.genecards.org/cgi-bin/carddisp.pl?gene={selected_gene})**")
 
-# --- LOAD DATA ---
-df = get_kegg_genes("hsa05016")
-if not df.empty:
-    df["Functional Role"] = df.apply(lambda row: assign_role(row["Symbol"], row["Description"]), axis=1)
+    filtered_df = df
+    if search_query:
+        # Literal, case-insensitive substring match over the per-row search blob
+        filtered_df = df.iloc[search_gene_rows(search_blob, search_query)]
+    st.dataframe(filtered_df, use_container_width=True, height=250)
+
+# --- INTERACTOME TAB ---
+@st.fragment
+def render_interactome(df, ranked):
+    # A fragment: changing the network controls reruns only this block, not the whole script
+    st.write("### Network Controls")
+    c1, c2 = st.columns(2)
+    with c1:
+        roles = list(df['Functional Role'].unique())
+        selected_roles = st.multiselect("Filter by Mechanism:", roles, default=roles)
+    with c2:
+        remove_htt = st.checkbox("🔬 Remove HTT (View Secondary Controllers)", value=False)
+    
+    st.caption("⚠️ *Note: Network edges represent inferred functional associations based on KEGG pathway co-occurrence.*")
+
+    # Only the columns the graph needs; tied scores keep the same order as before
+    # With every mechanism selected the pre-sorted frame is already the answer; a subset is sorted on its own
+    if len(selected_roles) == len(roles):
+        plot_df = ranked[['Symbol', 'Functional Role', 'Score']].head(50)
+    else:
+        plot_df = df.loc[df['Functional Role'].isin(selected_roles), ['Symbol', 'Functional Role', 'Score']]
+        plot_df = plot_df.sort_values('Score', ascending=False).head(50)
     
-    def calculate_score(row):
-        score = 0
-        if "Core" in row['Functional Role']: score += 5
-        elif "Mitochondrial" in row['Functional Role']: score += 3
-        elif "Proteostasis" in row['Functional Role']: score += 3
-        else: score += 2
-        return score + (len(row['Description']) % 3)
-    df['Score'] = df.apply(calculate_score, axis=1)
+    casp3_degree_normal = 2 
+    if remove_htt:
+        plot_df = plot_df[plot_df['Symbol'] != 'HTT']
+
+    plot_df = plot_df.drop_duplicates('Symbol')
+
+    # Nodes are row positions in plot_df; edges are int32 index pairs
+    nodes = tuple(plot_df['Symbol'])
+    node_roles = tuple(plot_df['Functional Role'])
+    groups = [
+        members for role, members in plot_df.groupby('Functional Role', observed=True).indices.items()
+        if role != "🧬 Pathway Component"
+    ]
+    if not remove_htt and 'HTT' in nodes:
+        # HTT star: a two-node group per spoke
+        htt = nodes.index('HTT')
+        groups += [np.array([htt, i]) for i in range(len(nodes))]
+    edges = clique_edges(groups)
+    degrees = np.bincount(edges.ravel(), minlength=len(nodes))
+
+    col_stats, col_graph = st.columns([1, 3])
+    with col_stats:
+        st.markdown("### **Metrics**")
+        if nodes:
+            st.metric("Total Nodes", len(nodes))
+            if 'CASP3' in nodes:
+                c3_deg = degrees[nodes.index('CASP3')]
+                st.metric("CASP3 Centrality", f"Deg: {c3_deg}", delta=f"{c3_deg - casp3_degree_normal} vs HTT-present" if remove_htt else None)
+            st.write("---")
+            st.write("**Top Secondary Hubs**" if remove_htt else "**Top Hubs**")
+            for i in np.argsort(-degrees, kind='stable')[:3]:
+                st.write(f"• {nodes[i]}: {degrees[i]}")
+        st.info("💡 PSMC subunits indicate proteasome overload.")
+
+    with col_graph:
+        st.plotly_chart(build_network_figure(nodes, edges, node_roles, remove_htt), use_container_width=True)
+
+# --- LOAD DATA ---
+def load_hd_frame():
+    df = get_kegg_genes("hsa05016").copy()
+    if not df.empty:
+        df["Functional Role"] = assign_roles(df["Symbol"], df["Description"], CORE_HD_GENES, core_label="⭐ Core HD Gene")
+
+        role = df['Functional Role']
+        base = np.select(
+            [role.str.contains("Core", regex=False), role.str.contains("Mitochondrial|Proteostasis")],
+            [5, 3], default=2
+        )
+        df['Score'] = base + df['Description'].str.len() % 3
+        # Only seven distinct roles: integer codes make the isin/groupby/value_counts calls cheaper.
+        # Categories follow role_colors, so codes mean the same role in every frame.
+        df['Functional Role'] = pd.Categorical(df['Functional Role'], categories=list(role_colors))
+    return df
+
+# Keep the enriched frame, its search blob and its score ranking in session state so reruns skip the cache lookup and re-scoring
+if "hd_df" not in st.session_state:
+    try:
+        st.session_state.hd_df = load_hd_frame()
+        st.session_state.hd_search_blob = build_search_blob(st.session_state.hd_df, ['Symbol', 'Description', 'Functional Role'])
+        st.session_state.hd_ranked = st.session_state.hd_df.sort_values('Score', ascending=False)
+    except requests.RequestException as exc:
+        st.error(f"Could not load hsa05016 from KEGG: {exc}")
+        st.stop()
+df = st.session_state.hd_df
+search_blob = st.session_state.hd_search_blob
+ranked = st.session_state.hd_ranked
 
 # --- SIDEBAR ---
 st.sidebar.image("https://cdn-icons-png.flaticon.com/512/822/822143.png", width=80)
 st.sidebar.title("Researcher Profile")
 st.sidebar.markdown(f"**Name:** Yashwant Nama\n**Target:** PhD in Neurogenetics\n**Focus:** Huntington's Disease (HD)\n---")
 
-try:
-    with open("CV_Yashwant_Nama_PhD_Application.pdf", "rb") as file:
-        st.sidebar.download_button(label="📄 Download My CV", data=file, file_name="Yashwant_Nama_CV.pdf", mime="application/pdf")
-except:
+@st.cache_resource
+def load_cv_bytes():
+    # Read the PDF once per process instead of on every rerun
+    try:
+        with open("CV_Yashwant_Nama_PhD_Application.pdf", "rb") as file:
+            return file.read()
+    except OSError:
+        return None
+
+cv_bytes = load_cv_bytes()
+if cv_bytes:
+    st.sidebar.download_button(label="📄 Download My CV", data=cv_bytes, file_name="Yashwant_Nama_CV.pdf", mime="application/pdf")
+else:
     st.sidebar.warning("Note: CV PDF not found.")
 
 st.sidebar.header("Project Progress")
@@ -98,38 +229,19 @@ st.markdown("### Disease Context: hsa05016")
 tab1, tab2, tab3 = st.tabs(["📊 Target Discovery", "🕸️ Interaction Network", "🔬 Enrichment & Literature"])
 
 with tab1:
-    col_a, col_b = st.columns([2, 1])
-    with col_a:
-        st.subheader("Genetic Components")
-        search_query = st.text_input("🔍 Search genes or mechanisms:", placeholder="Type to filter...")
-    with col_b:
-        st.subheader("Deep Dive")
-        selected_gene = st.selectbox("External Research:", ["Select a Gene"] + list(df['Symbol'].unique()))
-        if selected_gene != "Select a Gene":
-            st.markdown(f"**[View {selected_gene} on GeneCards ↗️](https://www.genecards.org/cgi-bin/carddisp.pl?gene={selected_gene})**")
-
-    mask = df['Symbol'].str.contains(search_query.upper(), na=False) | \
-           df['Description'].str.contains(search_query, case=False, na=False) | \
-           df['Functional Role'].str.contains(search_query, case=False, na=False)
-    
-    filtered_df = df[mask] if search_query else df
-    st.dataframe(filtered_df, use_container_width=True, height=250)
+    render_gene_explorer(df, search_blob)
 
     st.markdown("---")
     st.subheader("🎯 Therapeutic Target Prioritization")
-    top_10 = df.sort_values('Score', ascending=False).head(10)
+    top_10 = ranked.head(10)
 
     c1, c2 = st.columns([1, 2])
     with c1:
         st.metric("Primary Target", top_10.iloc[0]['Symbol'])
-        csv_data = df.to_csv(index=False).encode('utf-8-sig')
-        st.download_button(label="📥 Export Analysis (CSV)", data=csv_data, file_name='HD_Target_Analysis.csv', mime='text/csv')
+        # The CSV is built only when the button is clicked, not on every rerun
+        st.download_button(label="📥 Export Analysis (CSV)", data=lambda: df.to_csv(index=False).encode('utf-8-sig'), file_name='HD_Target_Analysis.csv', mime='text/csv')
     with c2:
-        fig_bar, ax_bar = plt.subplots(figsize=(8, 4))
-        ax_bar.barh(top_10['Symbol'], top_10['Score'], color='#FF4B4B')
-        ax_bar.invert_yaxis()
-        plt.tight_layout()
-        st.pyplot(fig_bar)
+        st.plotly_chart(build_priority_figure(tuple(top_10['Symbol']), tuple(top_10['Score'])), use_container_width=True)
 
 with tab2:
     st.subheader("🕸️ Advanced Functional Interactome")
@@ -141,86 +253,7 @@ with tab2:
         * **CREB1 and PPARGC1A** serve as master bridges connecting transcriptional control with metabolic homeostasis.
         """)
 
-    st.write("### Network Controls")
-    c1, c2 = st.columns(2)
-    with c1:
-        roles = list(df['Functional Role'].unique())
-        selected_roles = st.multiselect("Filter by Mechanism:", roles, default=roles)
-    with c2:
-        remove_htt = st.checkbox("🔬 Remove HTT (View Secondary Controllers)", value=False)
-    
-    st.caption("⚠️ *Note: Network edges represent inferred functional associations based on KEGG pathway co-occurrence.*")
-
-    G = nx.Graph()
-    plot_df = df[df['Functional Role'].isin(selected_roles)].sort_values('Score', ascending=False).head(50)
-    
-    casp3_degree_normal = 2 
-    if remove_htt:
-        plot_df = plot_df[plot_df['Symbol'] != 'HTT']
-
-    for _, row in plot_df.iterrows():
-        G.add_node(row['Symbol'], role=row['Functional Role'], score=row['Score'])
-    
-    nodes_list = list(plot_df.iterrows())
-    for i, (idx, row) in enumerate(nodes_list):
-        if not remove_htt and row['Symbol'] != 'HTT' and 'HTT' in G.nodes: 
-            G.add_edge('HTT', row['Symbol'])
-        for j, (idx2, row2) in enumerate(nodes_list):
-            if i < j and row['Functional Role'] == row2['Functional Role'] and row['Functional Role'] != "🧬 Pathway Component":
-                G.add_edge(row['Symbol'], row2['Symbol'])
-
-    col_stats, col_graph = st.columns([1, 3])
-    with col_stats:
-        st.markdown("### **Metrics**")
-        if G.number_of_nodes() > 0:
-            degrees = dict(G.degree())
-            st.metric("Total Nodes", G.number_of_nodes())
-            if 'CASP3' in degrees:
-                c3_deg = degrees['CASP3']
-                st.metric("CASP3 Centrality", f"Deg: {c3_deg}", delta=f"{c3_deg - casp3_degree_normal} vs HTT-present" if remove_htt else None)
-            st.write("---")
-            st.write("**Top Secondary Hubs**" if remove_htt else "**Top Hubs**")
-            for hub, conn in sorted(degrees.items(), key=lambda x: x[1], reverse=True)[:3]:
-                st.write(f"• {hub}: {conn}")
-        st.info("💡 PSMC subunits indicate proteasome overload.")
-
-    with col_graph:
-        fig_net, ax_net = plt.subplots(figsize=(12, 9), dpi=300)
-        if G.number_of_nodes() > 0:
-            pos = nx.spring_layout(G, k=4.5 if remove_htt else 5.5, iterations=200, seed=42)
-            
-            for role, color in role_colors.items():
-                nodes = [n for n, attr in G.nodes(data=True) if attr.get('role') == role]
-                if nodes:
-                    nx.draw_networkx_nodes(G, pos, nodelist=nodes, node_color=color, node_size=160, alpha=0.8, label=role.split(' ', 1)[1])
-            
-            nx.draw_networkx_edges(G, pos, alpha=0.15, edge_color='grey')
-            nx.draw_networkx_labels(G, pos, font_size=6, font_weight='bold')
-
-            # --- DYNAMIC CLUSTER LABELS ---
-            if remove_htt:
-                def get_cluster_center(keywords):
-                    coords = [pos[n] for n in G.nodes if any(k in n for k in keywords)]
-                    return np.mean(coords, axis=0) if coords else None
-
-                apo_center = get_cluster_center(['CASP3', 'TP53', 'BDNF', 'CREB1'])
-                prot_center = get_cluster_center(['PSMA', 'PSMC', 'PSMD'])
-                meta_center = get_cluster_center(['COX', 'ATP5', 'UQCR'])
-
-                if apo_center is not None:
-                    plt.text(apo_center[0], apo_center[1] + 0.25, "Apoptosis &\nTranscriptional Control", 
-                             fontsize=9, color='grey', alpha=0.8, fontweight='bold', ha='center')
-                if prot_center is not None:
-                    # Pushed lower (-0.4) to clear the cluster nodes
-                    plt.text(prot_center[0], prot_center[1] - 0.4, "Proteasome\nStress Module", 
-                             fontsize=9, color='grey', alpha=0.8, fontweight='bold', ha='center')
-                if meta_center is not None:
-                    plt.text(meta_center[0], meta_center[1] + 0.25, "Metabolic\nCompensation", 
-                             fontsize=9, color='grey', alpha=0.8, fontweight='bold', ha='center')
-
-            plt.legend(loc='upper left', bbox_to_anchor=(1, 1), title="Mechanisms")
-        plt.axis('off')
-        st.pyplot(fig_net)
+    render_interactome(df, ranked)
 
 with tab3:
     st.subheader("📊 Mechanism-Level Enrichment Analysis")
@@ -228,17 +261,18 @@ with tab3:
 
     N = len(df)  
     n_sample = 30 
-    full_subset = df.sort_values('Score', ascending=False).head(n_sample)
-    enrich_results = []
+    full_subset = ranked.head(n_sample)
     mechanisms = [r for r in role_colors.keys() if r != "🧬 Pathway Component"]
+    # Per-mechanism counts for the top genes (k) and the whole pathway (M), one pass each
+    k_by_role = full_subset['Functional Role'].value_counts()
+    M_by_role = df['Functional Role'].value_counts()
     
-    for role in mechanisms:
-        k = len(full_subset[full_subset['Functional Role'] == role])
-        M = len(df[df['Functional Role'] == role])
-        _, p_val = fisher_exact([[k, n_sample-k], [M-k, N-M-(n_sample-k)]], alternative='greater')
-        enrich_results.append({"Mechanism": role, "Gene Count": k, "Raw P-Value": p_val})
-    
-    res_df = pd.DataFrame(enrich_results)
+    ks = np.array([k_by_role.get(role, 0) for role in mechanisms])
+    Ms = np.array([M_by_role.get(role, 0) for role in mechanisms])
+    # One-sided Fisher's exact test on [[k, n-k], [M-k, N-M-(n-k)]] for every mechanism at once;
+    # this is the same hypergeometric tail fisher_exact(alternative='greater') evaluates
+    p_values = hypergeom.cdf(n_sample - ks, N, n_sample, N - Ms)
+    res_df = pd.DataFrame({"Mechanism": mechanisms, "Gene Count": ks, "Raw P-Value": p_values})
     res_df['Adj. P-Value'] = (res_df['Raw P-Value'] * len(mechanisms)).clip(upper=1.0)
     res_df['-log10(p)'] = -np.log10(res_df['Adj. P-Value'].replace(0, 1e-10))
     res_df = res_df.sort_values("Adj. P-Value")
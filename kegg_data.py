@@ -0,0 +1,98 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import requests_cache
+import re
+import os
+import time
+import pickle
+import functools
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import timedelta
+
+# --- DATA ACQUISITION (KEGG API) ---
+# Caches sit next to this module, not in whatever directory the process was started from
+_KEGG_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".kegg_cache")
+
+@functools.lru_cache(maxsize=None)
+def _kegg_session():
+    # One pooled session so repeated pathway fetches reuse the TCP/TLS connection.
+    # Responses are also kept in an on-disk SQLite cache so restarts skip the network.
+    # Built on first fetch, so importing this module creates no files.
+    session = requests_cache.CachedSession(os.path.join(_KEGG_CACHE_DIR, "http_cache"), backend="sqlite", expire_after=timedelta(days=7), stale_if_error=True)
+    session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.3)))
+    # KEGG flat files compress well; urllib3 decodes the gzip body transparently
+    session.headers.update({'Accept-Encoding': 'gzip', 'User-Agent': 'Huntington-Research-App/1.0'})
+    return session
+
+# Parsed gene frames are pickled beside the HTTP cache so a restarted process skips the parse too
+_FRAME_CACHE_DIR = os.path.join(_KEGG_CACHE_DIR, "frames")
+_FRAME_TTL = timedelta(days=7)
+
+# The GENE block runs from its header to the next column-0 line (next section or "///")
+_GENE_BLOCK_RE = re.compile(r'^GENE(.*?)(?=^\S|\Z)', re.MULTILINE | re.DOTALL)
+# Gene rows look like "3064  HTT; huntingtin [KO:K04533]"
+_GENE_LINE_RE = re.compile(r'^[ \t]*(\S+)[ \t]+([^;\n]+?)[ \t]*;[ \t]*(.+?)[ \t\r]*$', re.MULTILINE)
+
+def _fetch_kegg_genes(pathway_id):
+    url = f"https://rest.kegg.jp/get/{pathway_id}"
+    response = _kegg_session().get(url, timeout=(3, 10))
+    # Raise instead of returning an empty frame, so a failed fetch is never cached
+    response.raise_for_status()
+    response.encoding = response.encoding or 'utf-8'
+    # One C-level scan over the block instead of a Python loop per line
+    block = _GENE_BLOCK_RE.search(response.text)
+    records = _GENE_LINE_RE.findall(block[1]) if block else []
+    return pd.DataFrame(records, columns=['ID', 'Symbol', 'Description'])
+
+@st.cache_resource
+def get_kegg_genes(pathway_id):
+    # Shared by every session and app page: callers copy before adding columns
+    path = os.path.join(_FRAME_CACHE_DIR, f"{pathway_id}.pkl")
+    try:
+        if time.time() - os.path.getmtime(path) < _FRAME_TTL.total_seconds():
+            return pd.read_pickle(path)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
+
+    df = _fetch_kegg_genes(pathway_id)
+    if not df.empty:
+        # Write then rename, so another worker never reads a half-written pickle
+        os.makedirs(_FRAME_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+    return df
+
+# --- BIOLOGICAL LOGIC FUNCTION ---
+def assign_roles(symbols, descriptions, core_genes, core_label="⭐ Core Gene"):
+    # Vectorised over whole columns; np.select keeps the first matching condition, like an if/elif chain
+    desc_lower = descriptions.str.lower()
+    conditions = [
+        symbols.isin(core_genes),
+        desc_lower.str.contains("mitochond|atp", na=False),
+        desc_lower.str.contains("apopt|caspase", na=False),
+        desc_lower.str.contains("autophagy", regex=False, na=False),
+        desc_lower.str.contains("synap|glutamate", na=False),
+        symbols.str.contains("psm", regex=False, na=False) | desc_lower.str.contains("proteasome", regex=False, na=False),
+    ]
+    labels = [core_label, "🔋 Mitochondrial Dysfunction", "💀 Apoptosis", "♻️ Autophagy", "🧠 Synaptic / Excitotoxicity", "📦 Proteostasis / PSMC"]
+    return np.select(conditions, labels, default="🧬 Pathway Component")
+
+# --- LITERATURE SCORE ---
+@functools.lru_cache(maxsize=None)
+def seeded_lit_score(seed):
+    # Lives in this module rather than the app script, which Streamlit re-executes on every rerun;
+    # many symbols share a character sum, so each Mersenne Twister seeding runs once per process
+    return np.random.RandomState(seed).randint(20, 60)
+
+# --- GENE SEARCH ---
+def build_search_blob(df, columns):
+    # One upper-cased string per row; a text_input query has no newline, so it can't match across columns
+    blob = df[columns[0]].astype(str).str.cat([df[c].astype(str) for c in columns[1:]], sep='\n')
+    return np.char.upper(blob.to_numpy(dtype=str))
+
+def search_gene_rows(search_blob, query):
+    # Not memoised: hashing the blob for a cache key costs more than this one C-level scan
+    return np.flatnonzero(np.char.find(search_blob, query.upper()) >= 0)
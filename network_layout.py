@@ -0,0 +1,93 @@
+import streamlit as st
+import os
+import hashlib
+import networkx as nx
+import numpy as np
+
+# igraph's C Fruchterman-Reingold is optional; without it the numpy loop below is used
+try:
+    import igraph
+except ImportError:
+    igraph = None
+
+# Finished layouts are also written here, next to this module, so a restarted process can reuse them
+LAYOUT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".layout_cache")
+
+
+# --- FRUCHTERMAN-REINGOLD (DENSE NUMPY) ---
+def fr_layout(n, edges, k=None, iterations=50, seed=42, threshold=1e-4):
+    # The dense Fruchterman-Reingold scheme of nx.spring_layout, run straight from the edge index array
+    if k is None:
+        k = np.sqrt(1.0 / n)
+    adjacency = np.zeros((n, n))
+    adjacency[edges[:, 0], edges[:, 1]] = 1
+    adjacency[edges[:, 1], edges[:, 0]] = 1
+
+    pos = np.random.RandomState(seed).rand(n, 2)
+    t = np.ptp(pos, axis=0).max() * 0.1
+    dt = t / (iterations + 1)
+    for _ in range(iterations):
+        delta = pos[:, None, :] - pos[None, :, :]
+        distance = np.clip(np.linalg.norm(delta, axis=-1), 0.01, None)
+        displacement = np.einsum('ijk,ij->ik', delta, k * k / distance ** 2 - adjacency * distance / k)
+        # Short steps are clamped to 0.01 as in current networkx; older releases set them to 0.1 instead
+        length = np.clip(np.linalg.norm(displacement, axis=-1), 0.01, None)
+        step = displacement * (t / length)[:, None]
+        pos += step
+        t -= dt
+        if np.linalg.norm(step) / n < threshold:
+            break
+    return nx.rescale_layout(pos)
+
+
+def igraph_layout(n, edges, iterations=50, seed=42):
+    # igraph derives its own spacing, so k is not used; rescaling keeps the output comparable
+    graph = igraph.Graph(n=n, edges=edges.tolist())
+    start = np.random.RandomState(seed).rand(n, 2).tolist()
+    coords = graph.layout_fruchterman_reingold(niter=iterations, seed=start, grid=False).coords
+    return nx.rescale_layout(np.array(coords))
+
+
+# --- GRAPH HELPERS ---
+def clique_edges(groups):
+    # Fully connect the node indices inside each group, dropping repeated pairs
+    blocks = [np.empty((0, 2), dtype=np.int32)]
+    for members in groups:
+        i, j = np.triu_indices(len(members), 1)
+        blocks.append(np.column_stack((members[i], members[j])))
+    edges = np.sort(np.concatenate(blocks).astype(np.int32), axis=1)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    return np.unique(edges, axis=0) if len(edges) else edges
+
+
+# --- CACHED LAYOUT ENTRY POINT ---
+@st.cache_data
+def compute_layout(n, edges, iterations=50, seed=42):
+    # Keyed on the node count and edge array so the force simulation only runs once per distinct graph.
+    # No spacing argument: igraph derives its own, and both backends rescale to the same box.
+    if n == 0:
+        return np.empty((0, 2))
+    if n == 1:
+        return np.zeros((1, 2))
+
+    method = 'igraph' if igraph is not None else 'fr'
+    edges = np.ascontiguousarray(edges, dtype=np.int32)
+    key = hashlib.sha1(f"{method}:{n}:{iterations}:{seed}:".encode() + edges.tobytes()).hexdigest()
+    path = os.path.join(LAYOUT_CACHE_DIR, f"{key}.npy")
+    try:
+        return np.load(path)
+    except (OSError, ValueError, EOFError):
+        pass
+
+    if method == 'igraph':
+        xy = igraph_layout(n, edges, iterations=iterations, seed=seed)
+    else:
+        xy = fr_layout(n, edges, iterations=iterations, seed=seed)
+
+    # Write then rename, so a concurrent reader never sees a half-written file
+    os.makedirs(LAYOUT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as fh:
+        np.save(fh, xy)
+    os.replace(tmp_path, path)
+    return xy
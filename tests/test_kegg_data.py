@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+import kegg_data
+from kegg_data import _fetch_kegg_genes, assign_roles, build_search_blob, search_gene_rows
+
+KEGG_ENTRY = """ENTRY       hsa05016                    Pathway
+NAME        Huntington disease - Homo sapiens (human)
+GENE        3064  HTT; huntingtin [KO:K04533]
+            627  BDNF;brain derived neurotrophic factor [KO:K04355]
+            4512  COX1; cytochrome c oxidase subunit I; mitochondrial [KO:K02256]
+COMPOUND    C00031  D-Glucose
+            C00002  ATP; adenosine triphosphate
+///
+"""
+
+
+class FakeSession:
+    def __init__(self, body, status_code=200):
+        self.body, self.status_code, self.calls, self.responses = body, status_code, [], []
+
+    def get(self, url, timeout=None):
+        self.calls.append((url, timeout))
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.url = url
+        response._content = self.body.encode('utf-8')
+        self.responses.append(response)
+        return response
+
+
+def fetch(monkeypatch, body, status_code=200):
+    session = FakeSession(body, status_code)
+    monkeypatch.setattr(kegg_data, '_kegg_session', lambda: session)
+    return _fetch_kegg_genes('hsa05016'), session
+
+
+# --- DATA ACQUISITION (KEGG API) ---
+def test_fetch_parses_gene_rows(monkeypatch):
+    df, session = fetch(monkeypatch, KEGG_ENTRY)
+    assert list(df.columns) == ['ID', 'Symbol', 'Description']
+    assert df.iloc[0].tolist() == ['3064', 'HTT', 'huntingtin [KO:K04533]']
+    assert session.calls == [('https://rest.kegg.jp/get/hsa05016', (3, 10))]
+
+
+def test_semicolon_without_space_is_parsed(monkeypatch):
+    df, _ = fetch(monkeypatch, KEGG_ENTRY)
+    assert df.iloc[1].tolist() == ['627', 'BDNF', 'brain derived neurotrophic factor [KO:K04355]']
+
+
+def test_second_semicolon_stays_in_description(monkeypatch):
+    df, _ = fetch(monkeypatch, KEGG_ENTRY)
+    assert df.iloc[2].tolist() == ['4512', 'COX1', 'cytochrome c oxidase subunit I; mitochondrial [KO:K02256]']
+
+
+def test_gene_block_stops_at_next_section(monkeypatch):
+    df, _ = fetch(monkeypatch, KEGG_ENTRY)
+    assert df['Symbol'].tolist() == ['HTT', 'BDNF', 'COX1']
+
+
+def test_gene_block_runs_to_end_of_text(monkeypatch):
+    df, _ = fetch(monkeypatch, "GENE        1  A; alpha\n            2  B; beta")
+    assert df.values.tolist() == [['1', 'A', 'alpha'], ['2', 'B', 'beta']]
+
+
+def test_missing_gene_block(monkeypatch):
+    df, _ = fetch(monkeypatch, "ENTRY       hsa00000\n///\n")
+    assert df.empty and list(df.columns) == ['ID', 'Symbol', 'Description']
+
+
+def test_crlf_line_endings(monkeypatch):
+    df, _ = fetch(monkeypatch, "GENE        1  A; alpha\r\n///\r\n")
+    assert df.values.tolist() == [['1', 'A', 'alpha']]
+
+
+def test_body_without_charset_is_read_as_utf8(monkeypatch):
+    # No Content-Type charset, so the fetcher must pick utf-8 rather than leave requests to guess
+    df, session = fetch(monkeypatch, "GENE        1  A; tubulin β [KO:K07375]\n///\n")
+    assert session.responses[0].encoding == 'utf-8'
+    assert df.loc[0, 'Description'] == 'tubulin β [KO:K07375]'
+
+
+def test_error_status_raises(monkeypatch):
+    with pytest.raises(requests.RequestException):
+        fetch(monkeypatch, "Not Found", status_code=404)
+
+
+# --- BIOLOGICAL LOGIC FUNCTION ---
+def test_role_precedence():
+    symbols = pd.Series(['HTT', 'G1', 'G2', 'G3', 'G4', 'G5', 'G6', 'G7'])
+    descriptions = pd.Series([
+        'mitochondrial huntingtin',
+        'mitochondrial caspase',
+        'caspase autophagy',
+        'autophagy synaptic',
+        'glutamate proteasome',
+        'proteasome subunit',
+        'ribosomal protein',
+        None,
+    ])
+    roles = assign_roles(symbols, descriptions, frozenset({'HTT'}))
+    assert list(roles) == [
+        "⭐ Core Gene",
+        "🔋 Mitochondrial Dysfunction",
+        "💀 Apoptosis",
+        "♻️ Autophagy",
+        "🧠 Synaptic / Excitotoxicity",
+        "📦 Proteostasis / PSMC",
+        "🧬 Pathway Component",
+        "🧬 Pathway Component",
+    ]
+
+
+def test_core_label_and_case_insensitive_descriptions():
+    roles = assign_roles(pd.Series(['HTT', 'X']), pd.Series(['', 'ATP Synthase']), frozenset({'HTT'}), core_label="⭐ Core HD Gene")
+    assert list(roles) == ["⭐ Core HD Gene", "🔋 Mitochondrial Dysfunction"]
+
+
+# --- GENE SEARCH ---
+def make_blob():
+    df = pd.DataFrame({
+        'Symbol': ['HTT', 'PSMC1', 'CASP3'],
+        'Functional Role': ['⭐ Core Gene', '📦 Proteostasis / PSMC', '💀 Apoptosis (caspase)'],
+    })
+    return build_search_blob(df, ['Symbol', 'Functional Role'])
+
+
+def test_search_is_case_insensitive():
+    assert list(search_gene_rows(make_blob(), 'psm')) == [1]
+
+
+def test_search_matches_any_column():
+    assert list(search_gene_rows(make_blob(), 'apoptosis')) == [2]
+
+
+def test_search_treats_query_literally():
+    blob = make_blob()
+    assert list(search_gene_rows(blob, '(')) == [2]
+    assert list(search_gene_rows(blob, '.')) == []
+    assert list(search_gene_rows(blob, 'H.T')) == []
+
+
+def test_search_does_not_match_across_columns():
+    assert list(search_gene_rows(make_blob(), 'HTT⭐')) == []
+
+
+def test_search_blob_is_one_string_per_row():
+    blob = make_blob()
+    assert isinstance(blob, np.ndarray) and blob.shape == (3,)
@@ -0,0 +1,41 @@
+import numpy as np
+
+from network_layout import clique_edges, compute_layout
+
+
+# --- GRAPH HELPERS ---
+def test_clique_edge_count_per_group():
+    groups = [np.arange(0, 5), np.arange(5, 8), np.arange(8, 9)]
+    edges = clique_edges(groups)
+    # 5 choose 2 + 3 choose 2; a single-member group adds nothing
+    assert len(edges) == 10 + 3
+    assert edges.dtype == np.int32
+
+
+def test_clique_edges_are_sorted_unique_pairs():
+    edges = clique_edges([np.array([3, 1, 2]), np.array([1, 3])])
+    assert edges.tolist() == [[1, 2], [1, 3], [2, 3]]
+
+
+def test_clique_edges_drop_self_loops():
+    # A hub joined to every node by two-member groups, including itself
+    edges = clique_edges([np.array([0, j]) for j in range(4)])
+    assert edges.tolist() == [[0, 1], [0, 2], [0, 3]]
+
+
+def test_clique_edges_empty():
+    assert clique_edges([]).shape == (0, 2)
+
+
+# --- CACHED LAYOUT ENTRY POINT ---
+def test_compute_layout_shape(tmp_path, monkeypatch):
+    monkeypatch.setattr('network_layout.LAYOUT_CACHE_DIR', str(tmp_path))
+    edges = clique_edges([np.arange(6)])
+    xy = compute_layout(6, edges)
+    assert xy.shape == (6, 2)
+    assert np.isfinite(xy).all()
+
+
+def test_compute_layout_trivial_graphs():
+    assert compute_layout(0, np.empty((0, 2), dtype=np.int32)).shape == (0, 2)
+    assert compute_layout(1, np.empty((0, 2), dtype=np.int32)).tolist() == [[0.0, 0.0]]